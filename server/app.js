@@ -5,6 +5,8 @@ import { fileURLToPath } from "url";
 import path from "path";
 import dotenv from "dotenv";
 import fetch from "node-fetch";
+import { spawn } from "child_process";
+import readline from "readline";
 //import priceRoutes from "./routes/prices.js";
 import pool from "./db.js";
 
@@ -57,6 +59,106 @@ app.use("/api/predict", predictRouter);
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
+// Offline crop data index used by the chatbot for factual lookups.
+// One long-running Python process keeps the index in memory and answers
+// one JSON line per question (see machineModels/analytics/crop_index.py).
+const venvPython =
+  process.env.VENV_PYTHON ||
+  path.resolve(__dirname, "src/machineModels/ml_env/bin/python");
+const cropIndexDir = path.resolve(__dirname, "src/machineModels/analytics");
+
+let cropIndexProcess = null;
+let cropIndexRequestId = 0;
+const cropIndexPending = new Map();
+
+// After a crash the index stays off for a while (doubling up to 10 minutes)
+// so a broken build is not respawned on every chat message
+const CROP_INDEX_MAX_BACKOFF = 10 * 60 * 1000;
+let cropIndexFailures = 0;
+let cropIndexRetryAt = 0;
+
+// Returns the running index process, or null while it is backing off
+function getCropIndexProcess() {
+  if (cropIndexProcess) return cropIndexProcess;
+  if (Date.now() < cropIndexRetryAt) return null;
+
+  const py = spawn(venvPython, ["crop_index.py", "serve"], {
+    cwd: cropIndexDir,
+  });
+
+  readline.createInterface({ input: py.stdout }).on("line", (line) => {
+    try {
+      const response = JSON.parse(line);
+      cropIndexFailures = 0;
+      const resolve = cropIndexPending.get(response.id);
+      if (resolve) {
+        cropIndexPending.delete(response.id);
+        resolve(response);
+      }
+    } catch (err) {
+      console.error("Crop index output error:", err);
+    }
+  });
+
+  py.stderr.on("data", (data) => {
+    console.error("Crop index stderr:", data.toString());
+  });
+
+  // Fail pending lookups and let a later question restart the process
+  const reset = (err) => {
+    if (err) console.error("Crop index process error:", err);
+    if (cropIndexProcess === py) {
+      cropIndexProcess = null;
+      cropIndexFailures += 1;
+      const backoff = Math.min(
+        CROP_INDEX_MAX_BACKOFF,
+        1000 * 2 ** cropIndexFailures,
+      );
+      cropIndexRetryAt = Date.now() + backoff;
+      console.error(`Crop index unavailable, retrying in ${backoff / 1000}s`);
+    }
+    for (const resolve of cropIndexPending.values()) resolve(null);
+    cropIndexPending.clear();
+  };
+  py.on("error", reset);
+  py.on("exit", () => reset());
+  py.stdin.on("error", reset);
+
+  cropIndexProcess = py;
+  return py;
+}
+
+// Resolves to the index answer, or null if the index is unavailable or slow
+function queryCropIndex(question, timeout = 5000) {
+  return new Promise((resolve) => {
+    const py = getCropIndexProcess();
+    if (!py) return resolve(null);
+
+    const id = ++cropIndexRequestId;
+    const timeoutId = setTimeout(() => {
+      cropIndexPending.delete(id);
+      resolve(null);
+    }, timeout);
+
+    cropIndexPending.set(id, (response) => {
+      clearTimeout(timeoutId);
+      resolve(response);
+    });
+
+    try {
+      py.stdin.write(JSON.stringify({ id, query: question }) + "\n");
+    } catch (err) {
+      console.error("Crop index query error:", err);
+      cropIndexPending.delete(id);
+      clearTimeout(timeoutId);
+      resolve(null);
+    }
+  });
+}
+
+// Load the index at startup so the first chat question does not pay for it
+getCropIndexProcess();
+
 // Serve static files from client/public
 // app.use(express.static(path.join(__dirname, "../client/public")));
 
@@ -931,6 +1033,19 @@ app.post("/api/chat", async (req, res) => {
   try {
     const { message, context, chatHistory, userLanguage } = req.body;
 
+    // Factual lookups (entity + time range) are answered from the offline index
+    const indexResult = await queryCropIndex(message);
+    const indexAnswered = Boolean(indexResult && indexResult.resolved);
+
+    if (indexAnswered && userLanguage !== "kn-IN") {
+      return res.json({
+        success: true,
+        reply: indexResult.answer,
+        source: "crop-index",
+        timestamp: new Date().toISOString(),
+      });
+    }
+
     if (!GEMINI_API_KEY) {
       return res.status(500).json({
         error: "Gemini API key not configured",
@@ -972,7 +1087,7 @@ app.post("/api/chat", async (req, res) => {
     );
 
     let newsContext = "";
-    if (isAskingForNews) {
+    if (isAskingForNews && !indexAnswered) {
       console.log("Fetching crop news...");
       const news = await fetchCropNews("crop prices agriculture India", 7);
       if (news && news.length > 0) {
@@ -987,6 +1102,11 @@ app.post("/api/chat", async (req, res) => {
       }
     }
 
+    // Kannada replies still go through Gemini, grounded on the index answer
+    const dataContext = indexAnswered
+      ? `\n\nFacts from the crop database:\n${indexResult.answer}`
+      : "";
+
     const prompt = `You are "My Crops", a helpful AI assistant for a Crop Price Prediction system. 
 
 Context about the system:
@@ -1000,7 +1120,7 @@ Current user context: ${context || "User is interacting with the crop price pred
 Previous conversation:
 ${conversationHistory}
 
-User message: ${message}${newsContext}
+User message: ${message}${newsContext}${dataContext}
 
 IMPORTANT: 
 - Keep responses concise and human-like
@@ -1014,6 +1134,7 @@ IMPORTANT:
 - If userLanguage is 'en-US', respond in English
 - Support both Kannada and English languages naturally
 - If news context is provided, incorporate relevant recent information into your response
+- If facts from the crop database are provided, answer with those exact figures
 - For news-related queries, mention specific crops, regions, or price trends mentioned in the news`;
 
     console.log("Sending request to Gemini API...");
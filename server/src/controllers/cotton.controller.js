@@ -16,6 +16,17 @@ const venvPython =
 const scriptDir = path.resolve(__dirname, "../machineModels/cotton/");
 const scriptPath = path.join(scriptDir, "predict.py");
 
+// Each request spawns its own predictor; cap its OpenMP/BLAS pools so
+// concurrent requests do not oversubscribe the cores
+const predictorThreads = process.env.PREDICTOR_THREADS || "1";
+const predictorEnv = {
+  ...process.env,
+  PREDICTOR_THREADS: predictorThreads,
+  OMP_NUM_THREADS: predictorThreads,
+  OPENBLAS_NUM_THREADS: predictorThreads,
+  MKL_NUM_THREADS: predictorThreads,
+};
+
 /**
  * Function to get rainfall data from database
  */
@@ -266,6 +277,7 @@ export const predictCottonPrice= async (req, res) => {
     const py = spawn(venvPython, args, {
       cwd: scriptDir,
       timeout: timeout,
+      env: predictorEnv,
     });
 
     let result = "";
@@ -18,6 +18,17 @@ const venvPython =
 const scriptDir = path.resolve(__dirname, "../mlModels");
 const scriptPath = path.join(scriptDir, "predict.py");
 
+// Each request spawns its own predictor; cap its OpenMP/BLAS pools so
+// concurrent requests do not oversubscribe the cores
+const predictorThreads = process.env.PREDICTOR_THREADS || "1";
+const predictorEnv = {
+  ...process.env,
+  PREDICTOR_THREADS: predictorThreads,
+  OMP_NUM_THREADS: predictorThreads,
+  OPENBLAS_NUM_THREADS: predictorThreads,
+  MKL_NUM_THREADS: predictorThreads,
+};
+
 // District Data
 const districtData = {
   Belgaum: { area: 96524.09, yield: 1.04 },
@@ -147,6 +158,7 @@ export const predictSingle = async (req, res) => {
     const py = spawn(venvPython, args, {
       cwd: scriptDir,
       timeout: timeout,
+      env: predictorEnv,
     });
 
     let result = "";
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# machineModels/analytics/correlation_cube.py - Precomputed price/rainfall correlation cube
+#
+# Usage:
+#   python correlation_cube.py build <crop>
+#   python correlation_cube.py update <crop>
+#   python correlation_cube.py get <crop> [district]
+#
+# The cube holds, per district, Pearson/Spearman correlations between the
+# monthly modal price and rainfall at lags 0-3, seasonal price indices and
+# the per-year/variety summary statistics served by /api/onion/summary-stats.
+# `update` only recomputes districts whose price or rainfall data gained
+# new months.
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import json
+from datetime import datetime
+
+from datasets import ANALYTICS_DIR, load_prices, load_rainfall
+
+CUBE_DIR = os.path.join(ANALYTICS_DIR, 'cube')
+LAGS = [0, 1, 2, 3]
+
+
+def cube_path(crop):
+    """Path of the read-only cube artifact for a crop"""
+    return os.path.join(CUBE_DIR, f'{crop}_cube.json')
+
+
+def _month_index(df):
+    return df['year'].astype(int) * 12 + df['month'].astype(int) - 1
+
+
+def _grouped_pearson(df, x, y, key):
+    """Pearson correlation of two columns within each group, in one pass"""
+    valid = df[[key, x, y]].dropna()
+    groups = valid[key]
+    xc = valid[x] - valid.groupby(key)[x].transform('mean')
+    yc = valid[y] - valid.groupby(key)[y].transform('mean')
+    num = (xc * yc).groupby(groups).sum()
+    den = np.sqrt((xc ** 2).groupby(groups).sum() * (yc ** 2).groupby(groups).sum())
+    # Constant series have no defined correlation
+    corr = num / den.replace(0, np.nan)
+    return corr, groups.value_counts()
+
+
+def _grouped_spearman(df, x, y, key):
+    """Spearman correlation as the Pearson correlation of within-group ranks"""
+    valid = df[[key, x, y]].dropna()
+    ranks = valid.groupby(key)[[x, y]].rank()
+    ranks[key] = valid[key]
+    corr, _ = _grouped_pearson(ranks, x, y, key)
+    return corr
+
+
+def monthly_price_rainfall(prices, rainfall):
+    """District-level monthly modal price joined with rainfall at every lag"""
+    monthly = prices.groupby(['district', 'year', 'month'], as_index=False)['modal_price'].mean()
+    monthly['month_idx'] = _month_index(monthly)
+
+    rain = rainfall[['district', 'year', 'month', 'rainfall_mm']].copy()
+    rain['month_idx'] = _month_index(rain)
+    rain = rain[['district', 'month_idx', 'rainfall_mm']]
+
+    for lag in LAGS:
+        lagged = rain.rename(columns={'rainfall_mm': f'rain_lag{lag}'})
+        lagged = lagged.assign(month_idx=lagged['month_idx'] + lag)
+        monthly = monthly.merge(lagged, on=['district', 'month_idx'], how='left')
+    return monthly
+
+
+def compute_cube(prices, rainfall):
+    """Compute cube entries for every district present in the given rows"""
+    monthly = monthly_price_rainfall(prices, rainfall)
+
+    correlations = {}
+    for lag in LAGS:
+        col = f'rain_lag{lag}'
+        pearson, counts = _grouped_pearson(monthly, 'modal_price', col, 'district')
+        spearman = _grouped_spearman(monthly, 'modal_price', col, 'district')
+        correlations[lag] = (pearson, spearman, counts)
+
+    # Seasonal index: calendar-month mean relative to the district mean (100 = average)
+    by_month = monthly.groupby(['district', 'month'])['modal_price'].mean()
+    district_mean = monthly.groupby('district')['modal_price'].mean()
+    seasonal = (by_month.div(district_mean, level='district') * 100).round(2)
+
+    stats = prices.groupby(['district', 'year', 'variety']).agg(
+        avg_price=('modal_price', 'mean'),
+        min_price=('modal_price', 'min'),
+        max_price=('modal_price', 'max'),
+        price_volatility=('modal_price', 'std'),
+        data_points=('modal_price', 'size'),
+        avg_rainfall_3mo=('total_rainfall_3months', 'mean'),
+        avg_area=('area_hectare', 'mean'),
+        avg_yield=('yield_tonne_per_hectare', 'mean'),
+    ).round(2).reset_index()
+    stats = stats.astype(object).where(stats.notna(), None)
+
+    watermark = monthly.groupby('district')['month_idx'].max()
+    rainfall_watermark = _latest_months(rainfall)
+
+    cube = {}
+    for district in monthly['district'].unique():
+        entry = {'correlations': [], 'seasonal_index': {}, 'summary_stats': []}
+        for lag, (pearson, spearman, counts) in correlations.items():
+            entry['correlations'].append({
+                'lag': lag,
+                'pearson': _clean(pearson.get(district)),
+                'spearman': _clean(spearman.get(district)),
+                'n': int(counts.get(district, 0)),
+            })
+        if district in seasonal.index.get_level_values('district'):
+            entry['seasonal_index'] = {
+                str(month): _clean(value) for month, value in seasonal.loc[district].items()
+            }
+        entry['summary_stats'] = (
+            stats[stats['district'] == district].drop(columns='district').to_dict('records')
+        )
+        entry['last_month'] = _month_label(watermark[district])
+        if district in rainfall_watermark.index:
+            entry['last_rainfall_month'] = rainfall_watermark[district]
+        cube[str(district)] = entry
+    return cube
+
+
+def _month_label(idx):
+    idx = int(idx)
+    return f'{idx // 12}-{idx % 12 + 1:02d}'
+
+
+def _latest_months(df):
+    """Latest month label per district of a price or rainfall table"""
+    return _month_index(df).groupby(df['district']).max().map(_month_label)
+
+
+def _clean(value):
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), 4)
+
+
+def load_cube(crop):
+    """Load the cube artifact, or None if it has not been built yet"""
+    path = cube_path(crop)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_cube(crop, districts):
+    os.makedirs(CUBE_DIR, exist_ok=True)
+    cube = {
+        'crop': crop,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'lags': LAGS,
+        'districts': districts,
+    }
+    # Write to a temp file first so readers never see a half-written cube
+    tmp_path = cube_path(crop) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cube, f, separators=(',', ':'))
+    os.replace(tmp_path, cube_path(crop))
+    return cube
+
+
+def build_cube(crop):
+    """Rebuild the cube for every district of a crop"""
+    districts = compute_cube(load_prices(crop), load_rainfall(crop))
+    save_cube(crop, districts)
+    return {'crop': crop, 'districts': sorted(districts)}
+
+
+def update_cube(crop):
+    """Recompute only the districts that gained months since the last build"""
+    existing = load_cube(crop)
+    if existing is None:
+        return build_cube(crop)
+
+    prices = load_prices(crop)
+    rainfall = load_rainfall(crop)
+    latest_price = _latest_months(prices)
+    latest_rainfall = _latest_months(rainfall)
+
+    # Lagged correlations also change when only the rainfall table grows
+    stale = []
+    for district, month in latest_price.items():
+        entry = existing['districts'].get(str(district))
+        if (entry is None or month > entry['last_month']
+                or latest_rainfall.get(district, '') > entry.get('last_rainfall_month', '')):
+            stale.append(district)
+
+    districts = existing['districts']
+    if stale:
+        districts.update(compute_cube(
+            prices[prices['district'].isin(stale)],
+            rainfall[rainfall['district'].isin(stale)],
+        ))
+        save_cube(crop, districts)
+    return {'crop': crop, 'updated_districts': [str(d) for d in stale]}
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(json.dumps({'error': 'Usage: python correlation_cube.py <build|update|get> <crop> [district]'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+    crop = sys.argv[2]
+
+    try:
+        if command == 'build':
+            result = build_cube(crop)
+
+        elif command == 'update':
+            result = update_cube(crop)
+
+        elif command == 'get':
+            cube = load_cube(crop)
+            if cube is None:
+                build_cube(crop)
+                cube = load_cube(crop)
+            if len(sys.argv) > 3 and sys.argv[3]:
+                district = sys.argv[3]
+                if district not in cube['districts']:
+                    print(json.dumps({'error': f'Unknown district: {district}. Available options: {list(cube["districts"])}'}))
+                    sys.exit(1)
+                cube['districts'] = {district: cube['districts'][district]}
+            result = cube
+
+        else:
+            print(json.dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(json.dumps({'error': f'Cube {command} failed: {str(e)}'}))
+        sys.exit(1)
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
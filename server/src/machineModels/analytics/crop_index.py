@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+# machineModels/analytics/crop_index.py - Offline lookup index over the crop datasets
+#
+# Usage:
+#   python crop_index.py query "<question>" [YYYY-MM-DD]
+#   python crop_index.py serve
+#
+# The index keeps every price, rainfall, production and variety row in
+# memory, sorted by month. An inverted index maps crop/district/market/
+# variety names (and common spellings) to entities, and per-entity posting
+# lists of row ids are intersected and then cut to a time range with a
+# binary search. Questions like "modal onion price in Hubli last March"
+# resolve in milliseconds without the database or any outside service.
+# Only recorded data is served: questions about the future are left to the
+# models, and periods are cut at the last observed month of each crop.
+#
+# `serve` keeps the index loaded and answers one JSON request per stdin
+# line: {"id": 1, "query": "...", "today": "YYYY-MM-DD"} -> one JSON line.
+
+import pandas as pd
+import numpy as np
+import sys
+import re
+import json
+import time
+from datetime import date
+
+from datasets import CROP_DATASETS, load_prices, load_rainfall, load_production, load_varieties
+
+# Alternative spellings seen in user questions and older datasets
+ALIASES = {
+    'soy': ('crop', 'soyabean'),
+    'soya': ('crop', 'soyabean'),
+    'soybean': ('crop', 'soyabean'),
+    'soyabeen': ('crop', 'soyabean'),
+    'belgaum': ('district', 'Belagavi'),
+    'belagaum': ('district', 'Belagavi'),
+    'dharwar': ('district', 'Dharwad'),
+    'ballari': ('district', 'Bellary'),
+    'hubballi': ('market_name', 'Hubli (Amaragol)'),
+}
+
+METRIC_WORDS = {
+    'price': 'price', 'prices': 'price', 'rate': 'price', 'rates': 'price',
+    'cost': 'price', 'modal': 'price', 'min': 'price', 'minimum': 'price',
+    'max': 'price', 'maximum': 'price',
+    'rain': 'rainfall', 'rainfall': 'rainfall', 'monsoon': 'rainfall', 'precipitation': 'rainfall',
+    'yield': 'production', 'area': 'production', 'production': 'production',
+    'hectare': 'production', 'hectares': 'production',
+    'variety': 'variety', 'varieties': 'variety',
+}
+
+# Questions about the future are for the price models, not recorded data
+FORECAST_WORDS = {
+    'will', 'next', 'forecast', 'forecasts', 'forecasted',
+    'predict', 'predicted', 'prediction', 'predictions',
+}
+
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10,
+    'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12,
+}
+
+# Name fragments too generic to identify a market on their own
+GENERIC_TOKENS = {'local', 'other', 'white', 'red', 'onion', 'ginned', 'unginned', 'fine', 'market', 'name'}
+
+# Words that can follow "in"/"at" without naming a place
+NON_PLACE_WORDS = {
+    'the', 'a', 'last', 'this', 'that', 'past', 'total', 'general', 'average',
+    'rs', 'rupees', 'kg', 'quintal', 'quintals', 'mm', 'tonne', 'tonnes',
+    'karnataka', 'state', 'market', 'markets', 'kannada', 'english',
+}
+
+ENTITY_FIELDS = ['crop', 'district', 'market_name', 'variety']
+
+# When one word names several entities (e.g. Gadag), prefer the broader one
+FIELD_PRIORITY = {'crop': 0, 'district': 1, 'market_name': 2, 'variety': 3}
+
+MAX_BREAKDOWN = 24
+
+
+def _normalize(text):
+    return ' '.join(re.findall(r'[a-z0-9]+', str(text).lower()))
+
+
+def _month_label(idx):
+    return f'{idx // 12}-{idx % 12 + 1:02d}'
+
+
+class CropIndex:
+    """In-memory inverted and numeric index over the crop datasets"""
+
+    def __init__(self, tables):
+        self.tables = {}
+        self.time_keys = {}
+        self.postings = {}
+        self.phrases = {}
+
+        for name, df in tables.items():
+            if 'month_idx' in df.columns:
+                df = df.sort_values('month_idx', kind='stable', ignore_index=True)
+                self.time_keys[name] = df['month_idx'].to_numpy()
+            self.tables[name] = df
+            # groupby().indices gives the sorted row ids of every value
+            self.postings[name] = {}
+            for field in ENTITY_FIELDS:
+                if field in df.columns:
+                    for value, rows in df.groupby(field).indices.items():
+                        self.postings[name][(field, value)] = rows
+                        self._add_phrase(field, value)
+
+        for phrase, entity in ALIASES.items():
+            self.phrases.setdefault(phrase, set()).add(entity)
+
+    @classmethod
+    def build(cls):
+        """Load every crop dataset into a new index"""
+        prices, rainfall, production, varieties = [], [], [], []
+        for crop in CROP_DATASETS:
+            df = load_prices(crop)
+            df['crop'] = crop
+            prices.append(df)
+            df = load_rainfall(crop)
+            df['crop'] = crop
+            rainfall.append(df)
+            df = load_production(crop)
+            df['crop'] = crop
+            production.append(df)
+            df = load_varieties(crop)
+            if df is not None:
+                df = df.melt(id_vars='district', var_name='variety', value_name='arrivals')
+                df['crop'] = crop
+                varieties.append(df[df['arrivals'] > 0])
+
+        prices = pd.concat(prices, ignore_index=True)
+        prices['month_idx'] = prices['year'] * 12 + prices['month'] - 1
+
+        # Each crop dataset carries its own district rainfall series, so rows stay keyed on crop
+        rainfall = pd.concat(rainfall, ignore_index=True)
+        rainfall['month_idx'] = rainfall['year'] * 12 + rainfall['month'] - 1
+
+        production = pd.concat(production, ignore_index=True)
+        # Yearly rows sit on January so month ranges can be widened to whole years
+        production['month_idx'] = production['year'].astype(int) * 12
+
+        # The rainfall and production files run to 2027 with projected values;
+        # a crop's data was observed only up to its latest price month
+        observed = prices.groupby('crop')['month_idx'].max()
+        rainfall = rainfall[rainfall['month_idx'] <= rainfall['crop'].map(observed)]
+        production = production[production['month_idx'] + 11 <= production['crop'].map(observed)]
+
+        return cls({
+            'price': prices,
+            'rainfall': rainfall,
+            'production': production,
+            'variety': pd.concat(varieties, ignore_index=True),
+        })
+
+    def _add_phrase(self, field, value):
+        entity = (field, value)
+        phrase = _normalize(value)
+        self.phrases.setdefault(phrase, set()).add(entity)
+        # "Hubli" should find "Hubli (Amaragol)"
+        if field == 'market_name':
+            for token in phrase.split():
+                if len(token) > 3 and token not in GENERIC_TOKENS:
+                    self.phrases.setdefault(token, set()).add(entity)
+
+    def find_entities(self, text):
+        """Match 1-3 word phrases of the text against the inverted index"""
+        return self._match_entities(_normalize(text).split())[0]
+
+    def unknown_places(self, text):
+        """Words after "in"/"at" that name no known district, market or crop"""
+        tokens = _normalize(text).split()
+        used = self._match_entities(tokens)[1]
+        return [
+            tokens[i + 1] for i in range(len(tokens) - 1)
+            if tokens[i] in ('in', 'at') and i + 1 not in used and not _is_known_word(tokens[i + 1])
+        ]
+
+    def _match_entities(self, tokens):
+        """Entities found in the tokens and the token positions they cover"""
+        found = {}
+        used = set()
+        for size in (3, 2, 1):
+            for start in range(len(tokens) - size + 1):
+                span = set(range(start, start + size))
+                if span & used:
+                    continue
+                phrase = ' '.join(tokens[start:start + size])
+                entities = self.phrases.get(phrase)
+                if entities is None and size == 1 and phrase.endswith('s'):
+                    entities = self.phrases.get(phrase[:-1])
+                if not entities:
+                    continue
+                field, value = min(entities, key=lambda e: FIELD_PRIORITY[e[0]])
+                found.setdefault(field, value)
+                used |= span
+        return found, used
+
+    def lookup(self, table, filters, start=None, end=None):
+        """Rows of a table matching exact entity filters and an inclusive month range"""
+        df = self.tables[table]
+        rows = None
+        for field, value in filters.items():
+            if field not in df.columns:
+                continue
+            posting = self.postings[table].get((field, value))
+            if posting is None:
+                return df.iloc[:0]
+            rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(df))
+
+        if table in self.time_keys and (start is not None or end is not None):
+            # Row ids follow month order, so the range is one contiguous slice
+            keys = self.time_keys[table][rows]
+            lo = 0 if start is None else np.searchsorted(keys, start, side='left')
+            hi = len(keys) if end is None else np.searchsorted(keys, end, side='right')
+            rows = rows[lo:hi]
+        return df.iloc[rows]
+
+    def last_observed(self, table, filters):
+        """Last month a table has data for the filters, or None"""
+        rows = self.lookup(table, filters)
+        if rows.empty:
+            return None
+        last = int(rows['month_idx'].iloc[-1])
+        # Production is yearly and only observed once its December has passed
+        return last + 11 if table == 'production' else last
+
+    def query(self, text, today=None):
+        """Resolve a free-text question into entities, a month range and an answer"""
+        started = time.perf_counter()
+        today = today or date.today()
+        entities = self.find_entities(text)
+        metric = _parse_metric(text, entities)
+        start, end, period_text = parse_period(text, today)
+        forecast = bool(FORECAST_WORDS & set(_normalize(text).split()))
+
+        last = None
+        if start is not None and metric in self.time_keys and entities:
+            last = self.last_observed(metric, entities)
+            if last is not None and start <= last < end:
+                end = last
+                period_text += f' (data through {_month_label(last)})'
+
+        result = {
+            'resolved': False,
+            'metric': metric,
+            'entities': entities,
+            'period': None if start is None else {'start': _month_label(start), 'end': _month_label(end)},
+            'answer': None,
+        }
+
+        unknown = self.unknown_places(text)
+        if metric is None or not entities:
+            result['reason'] = 'No crop, district or market found in the question'
+        elif unknown:
+            # "onion price in Bangalore" must not fall back to the statewide figure
+            result['reason'] = f'Unknown place: {unknown[0]}'
+        elif metric in ('price', 'production') and 'crop' not in entities:
+            # Averaging onion, cotton and soyabean prices together means nothing
+            result['reason'] = 'Prices and production are recorded per crop and no crop was found'
+        elif metric == 'rainfall' and 'district' not in entities:
+            result['reason'] = 'Rainfall is recorded per district and no district was found'
+        elif last is not None and start > last:
+            result['reason'] = f'No observed data after {_month_label(last)}'
+        else:
+            summarize = {
+                'price': self._summarize_price,
+                'rainfall': self._summarize_rainfall,
+                'production': self._summarize_production,
+                'variety': self._summarize_variety,
+            }[metric]
+            if metric == 'production' and start is not None:
+                # Production is yearly; widen the range to whole years
+                start, end = start - start % 12, end - end % 12
+            rows = self.lookup(metric, entities, start, end)
+            if rows.empty:
+                result['reason'] = 'No matching records'
+            else:
+                summary, answer = summarize(rows, entities, period_text, text)
+                result['data'] = summary
+                result['answer'] = answer
+                # Only a lookup of recorded data bound to an explicit period is a complete answer
+                result['resolved'] = (start is not None or metric == 'variety') and not forecast
+                if forecast:
+                    result['reason'] = 'Forecast questions are answered by the price models'
+                elif not result['resolved']:
+                    result['reason'] = 'No time range in the question'
+
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def _summarize_price(self, rows, entities, period_text, text):
+        words = set(_normalize(text).split())
+        by_month = rows.groupby('month_idx')['modal_price'].mean()
+        summary = {
+            'avg_modal_price': round(float(rows['modal_price'].mean()), 2),
+            # The model datasets have no min/max columns; fall back to the modal range
+            'min_price': round(float(rows['min_price'].fillna(rows['modal_price']).min()), 2),
+            'max_price': round(float(rows['max_price'].fillna(rows['modal_price']).max()), 2),
+            'records': int(len(rows)),
+            'monthly': [
+                {'month': _month_label(idx), 'modal_price': round(float(v), 2)}
+                for idx, v in by_month.tail(MAX_BREAKDOWN).items()
+            ],
+        }
+        subject = _subject(entities)
+        if words & {'min', 'minimum', 'lowest'}:
+            answer = f'Lowest recorded price of {subject} {period_text}: Rs. {summary["min_price"]:,.2f}/quintal'
+        elif words & {'max', 'maximum', 'highest'}:
+            answer = f'Highest recorded price of {subject} {period_text}: Rs. {summary["max_price"]:,.2f}/quintal'
+        else:
+            answer = f'Average modal price of {subject} {period_text}: Rs. {summary["avg_modal_price"]:,.2f}/quintal'
+        answer += f' ({summary["records"]} records).'
+        return summary, answer
+
+    def _summarize_rainfall(self, rows, entities, period_text, text):
+        by_source = rows.groupby(['district', 'crop'])['rainfall_mm'].agg(['sum', 'mean', 'size'])
+        summary = [
+            {
+                'district': district, 'crop': crop,
+                'total_mm': round(float(r['sum']), 2),
+                'monthly_avg_mm': round(float(r['mean']), 2),
+                'months': int(r['size']),
+            }
+            for (district, crop), r in by_source.iterrows()
+        ]
+        answers = []
+        for district in dict.fromkeys(s['district'] for s in summary):
+            sources = [s for s in summary if s['district'] == district]
+            # Without a crop in the question, name the dataset only where they disagree
+            if len({(s['total_mm'], s['months']) for s in sources}) == 1:
+                sources = sources[:1]
+            parts = [
+                f'{s["total_mm"]:,.1f} mm'
+                + (f' over {s["months"]} months' if s['months'] > 1 else '')
+                + (f' ({s["crop"]} data)' if len(sources) > 1 else '')
+                for s in sources
+            ]
+            answers.append(f'Rainfall in {district} {period_text}: {", ".join(parts)}')
+        return summary, '; '.join(answers) + '.'
+
+    def _summarize_production(self, rows, entities, period_text, text):
+        summary = [
+            {
+                'crop': r['crop'], 'district': r['district'], 'year': int(r['year']),
+                'area_hectare': round(float(r['area_hectare']), 2),
+                'yield_tonne_per_hectare': round(float(r['yield_tonne_per_hectare']), 2),
+            }
+            for _, r in rows.iterrows()
+        ]
+        answer = '; '.join(
+            f'{s["crop"].capitalize()} in {s["district"]} ({s["year"]}): '
+            f'{s["area_hectare"]:,.0f} ha, yield {s["yield_tonne_per_hectare"]:,.2f}'
+            for s in summary[:MAX_BREAKDOWN]
+        ) + '.'
+        return summary, answer
+
+    def _summarize_variety(self, rows, entities, period_text, text):
+        totals = rows.groupby(['crop', 'district', 'variety'])['arrivals'].sum()
+        summary = [
+            {'crop': crop, 'district': district, 'variety': variety, 'arrivals': float(v)}
+            for (crop, district, variety), v in totals.items()
+        ]
+        answer = '; '.join(
+            f'{s["variety"]} ({s["crop"]}, {s["district"]}): {s["arrivals"]:,.0f}'
+            for s in sorted(summary, key=lambda s: -s['arrivals'])[:MAX_BREAKDOWN]
+        ) + '.'
+        return summary, answer
+
+
+def _subject(entities):
+    subject = entities.get('crop', 'crops')
+    if 'variety' in entities:
+        subject = f'{entities["variety"]} {subject}'
+    if 'market_name' in entities:
+        subject += f' in {entities["market_name"]}'
+    elif 'district' in entities:
+        subject += f' in {entities["district"]}'
+    return subject
+
+
+def _is_known_word(word):
+    return (word in NON_PLACE_WORDS or word in MONTHS or word in METRIC_WORDS
+            or word in FORECAST_WORDS or word.isdigit())
+
+
+def _parse_metric(text, entities):
+    for word in _normalize(text).split():
+        if word in METRIC_WORDS:
+            return METRIC_WORDS[word]
+    # A bare crop or market question is about prices
+    if entities:
+        return 'price'
+    return None
+
+
+def parse_period(text, today):
+    """
+    Turn a time expression into an inclusive (start, end) month-index range
+    Returns (None, None, '') when the text names no period.
+    """
+    words = _normalize(text).split()
+    current = today.year * 12 + today.month - 1
+    year_positions = [(i, int(w)) for i, w in enumerate(words) if re.fullmatch(r'(19|20)\d\d', w)]
+    years = [year for _, year in year_positions]
+    months = [(i, MONTHS[w]) for i, w in enumerate(words) if w in MONTHS]
+    # "may" is also a verb; only count it next to a year or after "in/last/of"
+    months = [(i, m) for i, m in months
+              if words[i] != 'may' or (i > 0 and words[i - 1] in ('in', 'last', 'of', 'since'))
+              or (i + 1 < len(words) and re.fullmatch(r'(19|20)\d\d', words[i + 1]))]
+
+    match = re.search(r'last (\d+) months', ' '.join(words))
+    if match:
+        n = int(match.group(1))
+        return current - n, current - 1, f'in the last {n} months'
+
+    if months:
+        month = months[0][1]
+        if years:
+            idx = years[0] * 12 + month - 1
+        else:
+            # "March" / "last March": the most recent March before this month
+            idx = today.year * 12 + month - 1
+            if idx >= current:
+                idx -= 12
+        if len(months) > 1:
+            end_pos, end_month = months[1]
+            if len(years) > 1:
+                end = years[1] * 12 + end_month - 1
+            else:
+                # "from March to June 2022": both months share the one year
+                end = idx - idx % 12 + end_month - 1
+                if end < idx:
+                    # "November to February 2023": a year after both months belongs to the later one
+                    if year_positions and year_positions[0][0] > end_pos:
+                        idx -= 12
+                    else:
+                        end += 12
+            return idx, end, f'from {_month_label(idx)} to {_month_label(end)}'
+        return idx, idx, f'in {_month_label(idx)}'
+
+    if 'since' in words and years:
+        return years[0] * 12, current, f'since {years[0]}'
+    if len(years) > 1:
+        lo, hi = min(years[:2]), max(years[:2])
+        return lo * 12, hi * 12 + 11, f'from {lo} to {hi}'
+    if years:
+        return years[0] * 12, years[0] * 12 + 11, f'in {years[0]}'
+    if 'last year' in ' '.join(words):
+        year = today.year - 1
+        return year * 12, year * 12 + 11, f'in {year}'
+    if 'this year' in ' '.join(words):
+        return today.year * 12, current, f'in {today.year}'
+    if 'last month' in ' '.join(words):
+        return current - 1, current - 1, f'in {_month_label(current - 1)}'
+    return None, None, ''
+
+
+def _parse_today(value):
+    return date.fromisoformat(value) if value else None
+
+
+def serve(index):
+    """Answer one JSON request per stdin line until stdin closes"""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = {}
+        try:
+            request = json.loads(line)
+            response = index.query(request['query'], _parse_today(request.get('today')))
+        except Exception as e:
+            response = {'resolved': False, 'error': f'Query failed: {str(e)}'}
+        response['id'] = request.get('id')
+        sys.stdout.write(json.dumps(response) + '\n')
+        sys.stdout.flush()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(json.dumps({'error': 'Usage: python crop_index.py <query|serve> [args...]'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    try:
+        if command == 'query':
+            if len(sys.argv) < 3:
+                print(json.dumps({'error': 'Query requires a question'}))
+                sys.exit(1)
+            today = _parse_today(sys.argv[3]) if len(sys.argv) > 3 else None
+            result = CropIndex.build().query(sys.argv[2], today)
+
+        elif command == 'serve':
+            serve(CropIndex.build())
+            return
+
+        else:
+            print(json.dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(json.dumps({'error': f'Crop index {command} failed: {str(e)}'}))
+        sys.exit(1)
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# machineModels/analytics/datasets.py - Shared loaders for the per-crop model datasets
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Get the directory of the machineModels folder
+MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANALYTICS_DIR = os.path.join(MODELS_DIR, 'analytics')
+
+# Dataset and model files for every crop, relative to machineModels/
+CROP_DATASETS = {
+    'onion': {
+        'dir': 'onion-final',
+        'prices': 'onion_model_dataset.csv',
+        'rainfall': 'onion_rainfall.csv',
+        'production': 'onion_yield_dataset_2018_2027.csv',
+        'varieties': 'onion_variety_distribution.csv',
+        'model': 'onion.pkl',
+    },
+    'cotton': {
+        'dir': 'cotton',
+        'prices': 'cotton_model_dataset.csv',
+        'rainfall': 'cotton_rainfall.csv',
+        'production': 'cotton_yield_dataset_2018_2027.csv',
+        'varieties': 'cotton_variety_distribution.csv',
+        'model': 'cotton_model.pkl',
+    },
+    'soyabean': {
+        'dir': 'soyabean',
+        'prices': 'soy_model_dataset.csv',
+        'rainfall': 'soy_rainfall.csv',
+        'production': 'soy_yield_dataset_2018_2027.csv',
+        'varieties': None,
+        # The served soy model is loaded by mlModels/predict.py, not soyabean/
+        'model': os.path.join('..', '..', 'mlModels', 'xgboost_price_model.pkl'),
+    },
+}
+
+# CSV headers and processed_*.json keys mapped to one snake_case naming
+PRICE_COLUMNS = {
+    'District': 'district',
+    'Market Name': 'market_name',
+    'Variety': 'variety',
+    'Modal Price (Rs./Quintal)': 'modal_price',
+    'modal_price_rs_per_quintal': 'modal_price',
+    'Min Price (Rs./Quintal)': 'min_price',
+    'Max Price (Rs./Quintal)': 'max_price',
+    'Year': 'year',
+    'Month': 'month',
+    'Rainfall_Minus1': 'rainfall_minus1',
+    'Rainfall_Minus2': 'rainfall_minus2',
+    'Rainfall_Minus3': 'rainfall_minus3',
+    'Total_Rainfall_3Months': 'total_rainfall_3months',
+    'Area_Hectare': 'area_hectare',
+    'Yield_TonnePerHectare': 'yield_tonne_per_hectare',
+}
+
+RAINFALL_COLUMNS = {
+    'District': 'district',
+    'Year': 'year',
+    'Month': 'month',
+    'Rainfall_mm': 'rainfall_mm',
+    'Rainfall_lag_1': 'rainfall_lag_1',
+    'Rainfall_lag_2': 'rainfall_lag_2',
+    'Rainfall_lag_3': 'rainfall_lag_3',
+    'Rainfall_3mo_sum': 'rainfall_3mo_sum',
+}
+
+PRODUCTION_COLUMNS = {
+    'District': 'district',
+    'Year': 'year',
+    'Area_Hectare': 'area_hectare',
+    'Yield_TonnePerHectare': 'yield_tonne_per_hectare',
+}
+
+
+def dataset_path(crop, kind):
+    """Return the absolute path of a crop dataset, or None if the crop has none"""
+    if crop not in CROP_DATASETS:
+        raise ValueError(f'Unknown crop: {crop}. Available options: {list(CROP_DATASETS)}')
+    filename = CROP_DATASETS[crop].get(kind)
+    if filename is None:
+        return None
+    return os.path.normpath(os.path.join(MODELS_DIR, CROP_DATASETS[crop]['dir'], filename))
+
+
+def read_rows(path):
+    """Read rows from a CSV file or a JSON array (processed_*.json layout)"""
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            return pd.DataFrame(json.load(f))
+    # utf-8-sig strips the BOM some exported CSVs carry on the first header
+    return pd.read_csv(path, encoding='utf-8-sig')
+
+
+def normalize_prices(df):
+    """Rename price columns to snake_case; min/max stay empty when the source lacks them"""
+    df = df.rename(columns=PRICE_COLUMNS)
+    df['modal_price'] = pd.to_numeric(df['modal_price'], errors='coerce')
+    # The model datasets only carry the modal price
+    for col in ['min_price', 'max_price']:
+        if col not in df.columns:
+            df[col] = np.nan
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df['year'] = df['year'].astype(int)
+    df['month'] = df['month'].astype(int)
+    return df.dropna(subset=['modal_price'])
+
+
+def load_prices(crop):
+    """Load a crop's model dataset with normalized column names"""
+    return normalize_prices(read_rows(dataset_path(crop, 'prices')))
+
+
+def load_rainfall(crop):
+    """Load a crop's monthly rainfall table"""
+    df = read_rows(dataset_path(crop, 'rainfall')).rename(columns=RAINFALL_COLUMNS)
+    # Some exports end with an empty ",,,,,,," row
+    df = df.dropna(subset=['district', 'year', 'month'])
+    return df.astype({'year': int, 'month': int})
+
+
+def load_production(crop):
+    """Load a crop's yearly area/yield table"""
+    return read_rows(dataset_path(crop, 'production')).rename(columns=PRODUCTION_COLUMNS)
+
+
+def load_varieties(crop):
+    """Load a crop's variety distribution, or None if it was never collected"""
+    path = dataset_path(crop, 'varieties')
+    if path is None:
+        return None
+    return read_rows(path).rename(columns={'District': 'district'})
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# machineModels/analytics/model_selection.py - Time-series CV harness for picking crop models
+#
+# Usage:
+#   python model_selection.py run <crop> [n_splits]
+#   python model_selection.py report <crop>
+#
+# Each crop's feature matrix is built once and cached under analytics/cache/;
+# the cache is invalidated when the dataset file changes. Every candidate
+# model is scored on every time-series fold in parallel across all cores and
+# the report records accuracy alongside inference latency and model size.
+# Latency and size are measured afterwards, one candidate at a time on an
+# otherwise idle machine, so the timings do not depend on which folds
+# happened to be training alongside.
+
+import joblib
+import pandas as pd
+import numpy as np
+import sys
+import os
+import json
+import time
+import pickle
+from joblib import Parallel, delayed
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.pipeline import make_pipeline
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.neural_network import MLPRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from xgboost import XGBRegressor
+
+from datasets import ANALYTICS_DIR, dataset_path, load_prices
+
+CACHE_DIR = os.path.join(ANALYTICS_DIR, 'cache')
+REPORT_DIR = os.path.join(ANALYTICS_DIR, 'reports')
+
+# Same column order the predictors build their input DataFrame with
+FEATURE_COLUMNS = [
+    'District', 'Market Name', 'Variety', 'Year', 'Month',
+    'Rainfall_Minus1', 'Rainfall_Minus2', 'Rainfall_Minus3', 'Total_Rainfall_3Months',
+    'Area_Hectare', 'Yield_TonnePerHectare',
+]
+CATEGORICAL_COLUMNS = ['District', 'Market Name', 'Variety']
+
+# Every model runs single-threaded; parallelism comes from running folds side by side
+CANDIDATES = {
+    'xgboost_shallow': lambda: XGBRegressor(n_estimators=200, max_depth=4, learning_rate=0.1, n_jobs=1),
+    'xgboost_deep': lambda: XGBRegressor(n_estimators=400, max_depth=8, learning_rate=0.05, n_jobs=1),
+    'random_forest_small': lambda: RandomForestRegressor(n_estimators=100, max_depth=12, random_state=42, n_jobs=1),
+    'random_forest_large': lambda: RandomForestRegressor(n_estimators=300, random_state=42, n_jobs=1),
+    'mlp_small': lambda: make_pipeline(
+        StandardScaler(), MLPRegressor(hidden_layer_sizes=(64,), max_iter=500, random_state=42)),
+    'mlp_wide': lambda: make_pipeline(
+        StandardScaler(), MLPRegressor(hidden_layer_sizes=(128, 64), max_iter=500, random_state=42)),
+}
+
+LATENCY_REPEATS = 50
+
+# Bumped whenever build_feature_matrix changes, so older caches are rebuilt
+FEATURE_MATRIX_VERSION = 2
+
+
+def _source_signature(crop):
+    stat = os.stat(dataset_path(crop, 'prices'))
+    return f'v{FEATURE_MATRIX_VERSION}-{stat.st_size}-{int(stat.st_mtime)}'
+
+
+def build_feature_matrix(crop):
+    """Encode a crop's model dataset into a chronologically sorted feature matrix"""
+    df = load_prices(crop).sort_values(['year', 'month'], kind='stable', ignore_index=True)
+    # load_prices uses snake_case names; the models are trained on the CSV headers
+    df = df.rename(columns={
+        'district': 'District', 'market_name': 'Market Name', 'variety': 'Variety',
+        'year': 'Year', 'month': 'Month',
+        'rainfall_minus1': 'Rainfall_Minus1', 'rainfall_minus2': 'Rainfall_Minus2',
+        'rainfall_minus3': 'Rainfall_Minus3', 'total_rainfall_3months': 'Total_Rainfall_3Months',
+        'area_hectare': 'Area_Hectare', 'yield_tonne_per_hectare': 'Yield_TonnePerHectare',
+    })
+
+    label_encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col].astype(str))
+        label_encoders[col] = le
+
+    # Some recent rows were exported before their rainfall lags were filled
+    # in (onion: Dharwad 2025-06/07); the MLP candidates cannot take NaN inputs
+    df = df.dropna(subset=FEATURE_COLUMNS, ignore_index=True)
+
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df['modal_price'].to_numpy(dtype=np.float64)
+    return {'X': X, 'y': y, 'feature_names': FEATURE_COLUMNS, 'label_encoders': label_encoders}
+
+
+def load_feature_matrix(crop):
+    """Return the cached feature matrix, rebuilding it if the dataset changed"""
+    path = os.path.join(CACHE_DIR, f'{crop}_features.joblib')
+    signature = _source_signature(crop)
+    if os.path.exists(path):
+        cached = joblib.load(path)
+        if cached.get('source_signature') == signature:
+            return cached
+
+    features = build_feature_matrix(crop)
+    features['source_signature'] = signature
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    joblib.dump(features, path)
+    return features
+
+
+def _measure_latency(model, X):
+    """Median single-row latency and per-row batch latency, in milliseconds"""
+    row = X[:1]
+    single = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict(row)
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.predict(X)
+    batch = (time.perf_counter() - start) / len(X)
+    return float(np.median(single)) * 1000, batch * 1000
+
+
+def evaluate_fold(name, fold, X, y, train_idx, test_idx):
+    """Fit one candidate on one fold and score it"""
+    model = CANDIDATES[name]()
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    X_test, y_test = X[test_idx], y[test_idx]
+    pred = model.predict(X_test)
+
+    return {
+        'model': name,
+        'fold': fold,
+        'mae': float(mean_absolute_error(y_test, pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, pred))),
+        'mape': float(np.nanmean(np.abs((y_test - pred) / np.where(y_test == 0, np.nan, y_test)))) * 100,
+        'r2': float(r2_score(y_test, pred)),
+        'fit_seconds': fit_seconds,
+    }
+
+
+def measure_serving(name, X, y, X_eval):
+    """Refit a candidate on all rows and time it the way it would be served"""
+    model = CANDIDATES[name]().fit(X, y)
+    single_ms, batch_ms = _measure_latency(model, X_eval)
+    return {
+        'model': name,
+        'single_latency_ms': single_ms,
+        'batch_latency_ms_per_row': batch_ms,
+        'model_size_kb': len(pickle.dumps(model)) / 1024,
+    }
+
+
+def run_selection(crop, n_splits=5, n_jobs=-1):
+    """Cross-validate every candidate and write the comparison report"""
+    features = load_feature_matrix(crop)
+    X, y = features['X'], features['y']
+    splits = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(name, fold, X, y, train_idx, test_idx)
+        for name in CANDIDATES
+        for fold, (train_idx, test_idx) in enumerate(splits)
+    )
+
+    # Sequential, after the parallel jobs have finished
+    serving = pd.DataFrame([
+        measure_serving(name, X, y, X[splits[-1][1]]) for name in CANDIDATES
+    ])
+
+    folds = pd.DataFrame(fold_results)
+    summary = folds.drop(columns='fold').groupby('model').mean()
+    summary['mae_std'] = folds.groupby('model')['mae'].std()
+    summary = summary.reset_index().merge(serving, on='model')
+    summary = summary.sort_values('mae').round(4)
+
+    report = {
+        'crop': crop,
+        'rows': int(len(y)),
+        'n_splits': n_splits,
+        'models': summary.to_dict('records'),
+        'folds': folds.round(4).to_dict('records'),
+    }
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with open(os.path.join(REPORT_DIR, f'{crop}_model_selection.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(json.dumps({'error': 'Usage: python model_selection.py <run|report> <crop> [n_splits]'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+    crop = sys.argv[2]
+
+    try:
+        if command == 'run':
+            n_splits = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+            result = run_selection(crop, n_splits)
+            # Folds are in the saved report; keep stdout to the summary
+            result.pop('folds')
+
+        elif command == 'report':
+            path = os.path.join(REPORT_DIR, f'{crop}_model_selection.json')
+            if not os.path.exists(path):
+                print(json.dumps({'error': f'No report for {crop}. Run: python model_selection.py run {crop}'}))
+                sys.exit(1)
+            with open(path, 'r') as f:
+                result = json.load(f)
+
+        else:
+            print(json.dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(json.dumps({'error': f'Model selection {command} failed: {str(e)}'}))
+        sys.exit(1)
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# machineModels/analytics/price_rollups.py - Materialized monthly/quarterly price rollups
+#
+# Usage:
+#   python price_rollups.py build <crop>
+#   python price_rollups.py update <crop> <rows.csv|rows.json>
+#   python price_rollups.py trends <crop> [month|quarter|year] [district] [market] [variety]
+#
+# The rollup tables hold additive partials (counts, sums, min, max) per
+# district/market/variety and period, so new price rows are folded in
+# without rescanning history and trend queries only read the small tables.
+# Rows passed to `update` are also appended to an ingested-rows log, so a
+# later `build` from the dataset keeps them.
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import json
+
+from datasets import ANALYTICS_DIR, load_prices, normalize_prices, read_rows
+
+ROLLUP_DIR = os.path.join(ANALYTICS_DIR, 'rollups')
+
+KEY_COLUMNS = ['district', 'market_name', 'variety']
+PERIOD_COLUMNS = ['year', 'period']
+LEVELS = ['monthly', 'quarterly']
+
+ROW_COLUMNS = KEY_COLUMNS + ['year', 'month', 'modal_price', 'min_price', 'max_price']
+
+# Additive columns and how two partials of the same period are combined.
+# The model datasets only carry modal prices, so min/max partials count
+# just the rows that have a real min/max (range_count).
+PARTIAL_AGG = {
+    'count': 'sum',
+    'modal_sum': 'sum',
+    'modal_low': 'min',
+    'modal_high': 'max',
+    'range_count': 'sum',
+    'min_sum': 'sum',
+    'max_sum': 'sum',
+    'low': 'min',
+    'high': 'max',
+}
+
+
+def rollup_path(crop, level):
+    """Path of the materialized table for a crop and level"""
+    return os.path.join(ROLLUP_DIR, f'{crop}_{level}.csv')
+
+
+def ingested_path(crop):
+    """Path of the log of rows added through update_rollups"""
+    return os.path.join(ROLLUP_DIR, f'{crop}_ingested.csv')
+
+
+def compute_partials(prices, level):
+    """Reduce raw price rows to per-period partial aggregates"""
+    df = prices[ROW_COLUMNS].copy()
+    if level == 'monthly':
+        df['period'] = df['month']
+    else:
+        df['period'] = (df['month'] - 1) // 3 + 1
+
+    has_range = df['min_price'].notna() & df['max_price'].notna()
+    df['range_count'] = has_range.astype(int)
+    df['min_price'] = df['min_price'].where(has_range)
+    df['max_price'] = df['max_price'].where(has_range)
+
+    return df.groupby(KEY_COLUMNS + PERIOD_COLUMNS, as_index=False, sort=False).agg(
+        count=('modal_price', 'size'),
+        modal_sum=('modal_price', 'sum'),
+        modal_low=('modal_price', 'min'),
+        modal_high=('modal_price', 'max'),
+        range_count=('range_count', 'sum'),
+        min_sum=('min_price', 'sum'),
+        max_sum=('max_price', 'sum'),
+        low=('min_price', 'min'),
+        high=('max_price', 'max'),
+    )
+
+
+def merge_partials(existing, partials):
+    """Fold new partials into an existing rollup table"""
+    if existing is None or existing.empty:
+        combined = partials
+    else:
+        combined = pd.concat([existing, partials], ignore_index=True)
+    return combined.groupby(KEY_COLUMNS + PERIOD_COLUMNS, as_index=False).agg(PARTIAL_AGG)
+
+
+def load_rollup(crop, level):
+    """Load a materialized table, or None if it has not been built yet"""
+    path = rollup_path(crop, level)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+
+def save_rollup(crop, level, table):
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    table.to_csv(rollup_path(crop, level), index=False)
+
+
+def load_ingested(crop):
+    """Rows previously added through update_rollups, or None"""
+    path = ingested_path(crop)
+    if not os.path.exists(path):
+        return None
+    return normalize_prices(pd.read_csv(path))
+
+
+def build_rollups(crop):
+    """Rebuild every rollup level for a crop from its dataset and ingested rows"""
+    prices = load_prices(crop)[ROW_COLUMNS]
+    ingested = load_ingested(crop)
+    if ingested is not None:
+        prices = pd.concat([prices, ingested[ROW_COLUMNS]], ignore_index=True)
+    sizes = {}
+    for level in LEVELS:
+        table = merge_partials(None, compute_partials(prices, level))
+        save_rollup(crop, level, table)
+        sizes[level] = len(table)
+    return {'crop': crop, 'source_rows': len(prices), 'rollup_rows': sizes}
+
+
+def update_rollups(crop, rows_path):
+    """Fold newly arrived price rows into the existing rollups
+
+    Rows must not have been ingested before; the partials are additive
+    and a repeated file would be counted twice.
+    """
+    new_rows = normalize_prices(read_rows(rows_path))[ROW_COLUMNS]
+
+    # Without a base table the new rows would replace the history
+    if any(load_rollup(crop, level) is None for level in LEVELS):
+        build_rollups(crop)
+
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    path = ingested_path(crop)
+    new_rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+    sizes = {}
+    for level in LEVELS:
+        table = merge_partials(load_rollup(crop, level), compute_partials(new_rows, level))
+        save_rollup(crop, level, table)
+        sizes[level] = len(table)
+    return {'crop': crop, 'new_rows': len(new_rows), 'rollup_rows': sizes}
+
+
+def _period_label(year, period, group_by):
+    if group_by == 'month':
+        return year.astype(str) + '-' + period.astype(str).str.zfill(2)
+    if group_by == 'quarter':
+        return year.astype(str) + '-Q' + period.astype(str)
+    return year.astype(str)
+
+
+def _period_ordinal(year, period, group_by):
+    if group_by == 'month':
+        return year * 12 + period - 1
+    if group_by == 'quarter':
+        return year * 4 + period - 1
+    return year
+
+
+def _calendar_moving_avg(out, by, window):
+    """Moving average over calendar periods; missing periods leave gaps, not neighbours"""
+    def roll(group):
+        series = group.set_index('ordinal')['modal_price']
+        full = series.reindex(range(series.index.min(), series.index.max() + 1))
+        return full.rolling(window, min_periods=1).mean().reindex(series.index).set_axis(group.index)
+
+    if not by:
+        return roll(out)
+    return pd.concat([roll(group) for _, group in out.groupby(by)])
+
+
+def query_trends(crop, group_by='month', district=None, market=None, variety=None,
+                 by=None, window=3):
+    """
+    Read price trends from the rollups
+    group_by: month, quarter or year
+    by: optional key columns to keep as separate series (e.g. ['district'])
+    window: number of periods in the moving average
+    """
+    level = 'monthly' if group_by == 'month' else 'quarterly'
+    table = load_rollup(crop, level)
+    if table is None:
+        build_rollups(crop)
+        table = load_rollup(crop, level)
+
+    mask = np.ones(len(table), dtype=bool)
+    for col, value in (('district', district), ('market_name', market), ('variety', variety)):
+        if value:
+            mask &= (table[col] == value).to_numpy()
+    table = table[mask]
+
+    by = list(by or [])
+    if group_by == 'year':
+        table = table.assign(period=0)
+    out = table.groupby(by + PERIOD_COLUMNS, as_index=False).agg(PARTIAL_AGG)
+    out = out.sort_values(by + PERIOD_COLUMNS, ignore_index=True)
+
+    out['modal_price'] = out['modal_sum'] / out['count']
+    range_count = out['range_count'].where(out['range_count'] > 0)
+    out['avg_min_price'] = out['min_sum'] / range_count
+    out['avg_max_price'] = out['max_sum'] / range_count
+
+    out['ordinal'] = _period_ordinal(out['year'], out['period'], group_by)
+    out['moving_avg'] = _calendar_moving_avg(out, by, window) if len(out) else []
+
+    # Year-over-year change: join every period with the same period a year earlier
+    previous = out[by + PERIOD_COLUMNS + ['modal_price']].rename(columns={'modal_price': 'prev_modal'})
+    previous['year'] = previous['year'] + 1
+    out = out.merge(previous, on=by + PERIOD_COLUMNS, how='left')
+    out['yoy_change_pct'] = (out['modal_price'] - out['prev_modal']) / out['prev_modal'] * 100
+
+    out['price_date'] = _period_label(out['year'], out['period'], group_by)
+    out = out.rename(columns={
+        'modal_low': 'lowest_modal_price',
+        'modal_high': 'highest_modal_price',
+        'low': 'min_price',
+        'high': 'max_price',
+        'count': 'data_points',
+    })
+    columns = by + ['price_date', 'modal_price', 'lowest_modal_price', 'highest_modal_price']
+    # Min/max prices only exist for rows ingested with them (not the model datasets)
+    if out['range_count'].sum() > 0:
+        columns += ['min_price', 'max_price', 'avg_min_price', 'avg_max_price']
+    columns += ['moving_avg', 'yoy_change_pct', 'data_points']
+    out = out[columns].round(2)
+    return out.astype(object).where(out.notna(), None).to_dict('records')
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(json.dumps({'error': 'Usage: python price_rollups.py <build|update|trends> <crop> [args...]'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+    crop = sys.argv[2]
+
+    try:
+        if command == 'build':
+            result = build_rollups(crop)
+
+        elif command == 'update':
+            if len(sys.argv) < 4:
+                print(json.dumps({'error': 'Update requires a CSV or JSON file of new price rows'}))
+                sys.exit(1)
+            result = update_rollups(crop, sys.argv[3])
+
+        elif command == 'trends':
+            group_by = sys.argv[3] if len(sys.argv) > 3 else 'month'
+            if group_by not in ('month', 'quarter', 'year'):
+                print(json.dumps({'error': f'Invalid groupBy: {group_by}. Use month, quarter or year'}))
+                sys.exit(1)
+            # Empty strings mean "no filter" so callers can skip positions
+            filters = (sys.argv[4:7] + [None, None, None])[:3]
+            district, market, variety = [f or None for f in filters]
+            data = query_trends(crop, group_by, district, market, variety)
+            result = {
+                'data': data,
+                'totalRecords': int(sum(row['data_points'] for row in data)),
+                'filters': {'district': district, 'market': market,
+                            'variety': variety, 'groupBy': group_by},
+            }
+
+        else:
+            print(json.dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(json.dumps({'error': f'Rollup {command} failed: {str(e)}'}))
+        sys.exit(1)
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
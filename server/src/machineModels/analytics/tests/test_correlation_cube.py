@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from scipy import stats
+
+import correlation_cube
+
+
+@pytest.fixture(autouse=True)
+def cube_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(correlation_cube, 'CUBE_DIR', str(tmp_path / 'cube'))
+
+
+def test_onion_cube_matches_scipy():
+    correlation_cube.build_cube('onion')
+    cube = correlation_cube.load_cube('onion')
+
+    monthly = correlation_cube.monthly_price_rainfall(
+        correlation_cube.load_prices('onion'), correlation_cube.load_rainfall('onion'))
+    rows = monthly[monthly['district'] == 'Dharwad'].dropna(subset=['rain_lag2'])
+    lag2 = cube['districts']['Dharwad']['correlations'][2]
+    assert lag2['pearson'] == pytest.approx(stats.pearsonr(rows['modal_price'], rows['rain_lag2'])[0], abs=1e-4)
+    assert lag2['spearman'] == pytest.approx(stats.spearmanr(rows['modal_price'], rows['rain_lag2'])[0], abs=1e-4)
+
+
+def test_update_refreshes_districts_with_new_rainfall():
+    correlation_cube.build_cube('onion')
+    assert correlation_cube.update_cube('onion')['updated_districts'] == []
+
+    # Pretend Gadag's rainfall was last built before more months arrived
+    path = correlation_cube.cube_path('onion')
+    with open(path) as f:
+        cube = json.load(f)
+    cube['districts']['Gadag']['last_rainfall_month'] = '2020-01'
+    with open(path, 'w') as f:
+        json.dump(cube, f)
+
+    assert correlation_cube.update_cube('onion')['updated_districts'] == ['Gadag']
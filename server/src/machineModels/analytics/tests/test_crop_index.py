@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from crop_index import CropIndex, parse_period
+
+TODAY = date(2025, 6, 10)
+
+
+@pytest.fixture(scope='module')
+def index():
+    return CropIndex.build()
+
+
+def test_price_lookup_resolves(index):
+    result = index.query('modal onion price in Hubli last March', TODAY)
+    assert result['resolved']
+    assert result['entities'] == {'crop': 'onion', 'market_name': 'Hubli (Amaragol)'}
+    assert result['period'] == {'start': '2025-03', 'end': '2025-03'}
+    assert result['answer'].startswith('Average modal price of onion in Hubli (Amaragol) in 2025-03')
+
+
+def test_forecast_question_is_not_resolved(index):
+    result = index.query('will onion price in Hubli rise in March 2024', TODAY)
+    assert not result['resolved']
+    assert 'Forecast' in result['reason']
+
+
+def test_month_range_shares_one_year():
+    lo, hi, _ = parse_period('onion price from March to June 2022', TODAY)
+    assert (lo, hi) == (2022 * 12 + 2, 2022 * 12 + 5)
+    lo, hi, _ = parse_period('onion price from November to February 2023', TODAY)
+    assert (lo, hi) == (2022 * 12 + 10, 2023 * 12 + 1)
+
+
+def test_projected_rainfall_is_not_served(index):
+    result = index.query('rainfall in Dharwad June 2027', TODAY)
+    assert not result['resolved']
+    assert result['reason'] == 'No observed data after 2025-07'
+
+
+def test_period_is_cut_at_last_observed_month(index):
+    result = index.query('onion rainfall in Dharwad in 2025', TODAY)
+    assert result['resolved']
+    assert result['period'] == {'start': '2025-01', 'end': '2025-07'}
+    assert '(data through 2025-07)' in result['answer']
+
+
+def test_price_without_crop_is_not_resolved(index):
+    result = index.query('price in Dharwad in 2022', TODAY)
+    assert not result['resolved']
+    assert 'no crop' in result['reason']
+
+
+def test_unknown_place_is_not_resolved(index):
+    result = index.query('what was the price of onion in Bangalore in 2023', TODAY)
+    assert not result['resolved']
+    assert result['reason'] == 'Unknown place: bangalore'
+    assert index.query('onion price in Hubballi in 2024', TODAY)['resolved']
@@ -0,0 +1,60 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import explain
+from datasets import MODELS_DIR
+
+SOY_DIR = os.path.join(os.path.dirname(MODELS_DIR), 'mlModels')
+SOY_FEATURES = ['Year', 'Month', 'Rainfall_Minus1', 'Rainfall_Minus2',
+                'Rainfall_Minus3', 'Total_Rainfall_3Months',
+                'Area (Hectare)', 'Yield (Tonne/Hectare)']
+
+
+@pytest.fixture(scope='module')
+def soy_model():
+    with open(os.path.join(SOY_DIR, 'xgboost_price_model.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.fixture(scope='module')
+def soy_rows():
+    return pd.DataFrame([
+        [2022, 6, 100, 80, 60, 240, 5000, 1.2],
+        [2023, 1, 5, 10, 40, 55, 4200, 0.9],
+    ], columns=SOY_FEATURES)
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+@pytest.mark.parametrize('as_array', [False, True])
+def test_soy_contributions_add_up_to_prediction(soy_model, soy_rows, as_array):
+    X = soy_rows.to_numpy() if as_array else soy_rows
+    contribs, bias = explain.explain_batch(soy_model, X)
+    np.testing.assert_allclose(bias + contribs.sum(axis=1), soy_model.predict(soy_rows), rtol=1e-4)
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_cached_array_rows_keep_feature_names(soy_model, soy_rows, tmp_path):
+    cache = explain.ExplanationCache(path=str(tmp_path / 'soy.joblib'))
+    first = explain.explain_batch(soy_model, soy_rows.iloc[:1].to_numpy(), cache)
+    # Second call hits the cache for row 0 and computes row 1 from an array subset
+    contribs, bias = explain.explain_batch(soy_model, soy_rows.to_numpy(), cache)
+    np.testing.assert_allclose(contribs[0], first[0][0])
+    np.testing.assert_allclose(bias + contribs.sum(axis=1), soy_model.predict(soy_rows), rtol=1e-4)
+
+    cache.save()
+    assert os.listdir(tmp_path) == ['soy.joblib']
+    assert explain.ExplanationCache(path=cache.path).get(cache.key(soy_rows.to_numpy()[1])) is not None
+
+
+def test_forest_contributions_add_up_to_prediction():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = X[:, 0] * 3 + X[:, 1] ** 2 + rng.normal(size=300)
+    model = RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+    contribs, bias = explain.explain_batch(model, X[:50])
+    np.testing.assert_allclose(bias + contribs.sum(axis=1), model.predict(X[:50]))
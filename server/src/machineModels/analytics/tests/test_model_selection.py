@@ -0,0 +1,26 @@
+import numpy as np
+
+import model_selection
+
+
+def test_onion_feature_matrix_has_no_missing_values():
+    features = model_selection.build_feature_matrix('onion')
+    assert len(features['X']) == len(features['y']) > 0
+    assert not np.isnan(features['X']).any()
+
+
+def test_mlp_candidate_fits_onion_features():
+    features = model_selection.build_feature_matrix('onion')
+    X, y = features['X'][:500], features['y'][:500]
+    model = model_selection.CANDIDATES['mlp_small']().set_params(mlpregressor__max_iter=20)
+    assert model.fit(X, y).predict(X[:5]).shape == (5,)
+
+
+def test_serving_metrics_come_from_a_refit_candidate():
+    features = model_selection.build_feature_matrix('onion')
+    X, y = features['X'][:300], features['y'][:300]
+    result = model_selection.measure_serving('xgboost_shallow', X, y, X[-50:])
+    assert result['model'] == 'xgboost_shallow'
+    assert result['single_latency_ms'] > 0
+    assert result['batch_latency_ms_per_row'] > 0
+    assert result['model_size_kb'] > 0
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+import price_rollups
+
+
+@pytest.fixture(autouse=True)
+def rollup_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_rollups, 'ROLLUP_DIR', str(tmp_path / 'rollups'))
+
+
+def _write_rows(path, rows):
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def test_update_without_rollup_keeps_history(tmp_path):
+    history = len(price_rollups.load_prices('soyabean'))
+    rows = _write_rows(tmp_path / 'new.csv', [{
+        'district': 'Belagavi', 'market_name': 'Athani', 'variety': 'Soyabeen',
+        'modal_price': 5000, 'year': 2025, 'month': 6,
+    }])
+
+    price_rollups.update_rollups('soyabean', rows)
+    data = price_rollups.query_trends('soyabean', 'year')
+    assert sum(r['data_points'] for r in data) == history + 1
+
+    # A rebuild from the dataset keeps the ingested row
+    price_rollups.build_rollups('soyabean')
+    data = price_rollups.query_trends('soyabean', 'year')
+    assert sum(r['data_points'] for r in data) == history + 1
+
+
+def test_min_max_only_reported_when_ingested():
+    data = price_rollups.query_trends('soyabean', 'month')
+    assert 'avg_min_price' not in data[0]
+    assert all(r['lowest_modal_price'] <= r['modal_price'] <= r['highest_modal_price'] for r in data)
+
+
+def test_moving_average_spans_calendar_periods():
+    # Athani has no soyabean rows in 2019
+    data = price_rollups.query_trends('soyabean', 'year', 'Belagavi', 'Athani')
+    by_year = {r['price_date']: r for r in data}
+    assert '2019' not in by_year
+    expected = (by_year['2018']['modal_price'] + by_year['2020']['modal_price']) / 2
+    assert by_year['2020']['moving_avg'] == pytest.approx(expected, abs=0.01)
@@ -0,0 +1,53 @@
+import os
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+import worker_pool
+
+
+def test_throughput_plan_uses_every_core():
+    assert worker_pool.plan_pool('throughput', 6) == {
+        'profile': 'throughput', 'cores': 6, 'processes': 1, 'threads': 6}
+    assert worker_pool.plan_pool('throughput', 10)['processes'] == 2
+    assert worker_pool.plan_pool('throughput', 10)['threads'] == 5
+    assert worker_pool.plan_pool('latency', 6)['processes'] == 6
+
+
+def test_warm_up_reaches_every_worker(tmp_path):
+    X = np.arange(20, dtype=np.float64).reshape(10, 2)
+    path = str(tmp_path / 'linear.joblib')
+    joblib.dump(LinearRegression().fit(X, X.sum(axis=1)), path)
+
+    with worker_pool.PredictorPool({'linear': path}, processes=3, threads=1) as pool:
+        pids = pool.warm_up('linear')
+        assert len(set(pids)) == 3
+        np.testing.assert_allclose(pool.predict('linear', X[:2]), [1.0, 5.0])
+
+
+def test_onion_package_keeps_encoders_and_scaler(tmp_path):
+    import pandas as pd
+    from sklearn.neural_network import MLPRegressor
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    df = pd.DataFrame({'District': ['Gadag', 'Dharwad'] * 20, 'Year': np.arange(2000, 2040)})
+    y = np.arange(40, dtype=np.float64)
+    le = LabelEncoder().fit(df['District'])
+    encoded = df.assign(District=le.transform(df['District']))
+    scaler = StandardScaler().fit(encoded)
+    mlp = MLPRegressor(hidden_layer_sizes=(4,), max_iter=50, random_state=0).fit(scaler.transform(encoded), y)
+    path = str(tmp_path / 'onion.pkl')
+    joblib.dump({'model': mlp, 'label_encoders': {'District': le}, 'scaler': scaler,
+                 'model_type': 'MLP Regressor'}, path)
+
+    model = worker_pool.pin_model_threads(worker_pool.load_predictor(path), 1)
+    expected = mlp.predict(scaler.transform(encoded))
+    np.testing.assert_allclose(model.predict(df), expected)
+    np.testing.assert_allclose(model.predict(encoded), expected)
+
+
+def test_default_soy_model_is_the_served_one():
+    path = worker_pool.dataset_path('soyabean', 'model')
+    assert path.endswith(os.path.join('mlModels', 'xgboost_price_model.pkl'))
+    assert os.path.exists(path)
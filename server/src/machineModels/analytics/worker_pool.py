@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# machineModels/analytics/worker_pool.py - Prediction worker pool with native thread control
+#
+# Usage:
+#   python worker_pool.py plan [latency|throughput] [cores]
+#   python worker_pool.py benchmark <crop> [requests] [batch_size]
+#
+# Every XGBoost/sklearn/NumPy process starts OpenMP and BLAS pools as wide as
+# the machine, so a handful of concurrent predictors oversubscribe the cores.
+# The pool sizes processes x threads to the available cores and pins every
+# native pool inside each worker with threadpoolctl and the XGBoost nthread.
+#   latency    - one single-threaded worker per core, best for many small requests
+#   throughput - a few wide workers, best for large batches
+#
+# The crop predict.py scripts that the controllers spawn per request use
+# the same caps (PREDICTOR_THREADS, default 1) through predictor_threads().
+
+import joblib
+import numpy as np
+import pandas as pd
+import sys
+import os
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from threadpoolctl import threadpool_limits, threadpool_info
+
+from datasets import CROP_DATASETS, dataset_path
+
+PROFILES = ['latency', 'throughput']
+
+# Threads per worker in the throughput profile
+THROUGHPUT_THREADS = 4
+
+# Seconds warm_up waits for every worker to start and load its model
+WARM_UP_TIMEOUT = 120
+
+# Read by OpenMP/BLAS runtimes that are loaded after the worker starts
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+]
+
+# Worker-process state, filled by _init_worker
+_MODEL_PATHS = {}
+_MODELS = {}
+_THREADS = None
+
+
+def available_cores():
+    """Cores this process may run on (respects taskset/cgroup affinity)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def plan_pool(profile='latency', cores=None):
+    """Split the available cores into processes x threads for a profile"""
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown profile: {profile}. Available options: {PROFILES}')
+    cores = cores or available_cores()
+    if profile == 'latency':
+        processes = cores
+    else:
+        processes = max(1, cores // THROUGHPUT_THREADS)
+    # Leftover cores go to the workers' thread pools rather than sitting idle
+    threads = cores // processes
+    return {'profile': profile, 'cores': cores, 'processes': processes, 'threads': threads}
+
+
+def predictor_threads():
+    """Threads for a predictor process spawned per request (PREDICTOR_THREADS, default 1)"""
+    return int(os.environ.get('PREDICTOR_THREADS', 1))
+
+
+def limit_native_threads(threads):
+    """Cap every OpenMP/BLAS pool in the current process"""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    threadpool_limits(limits=threads)
+
+
+def pin_model_threads(model, threads):
+    """Set the thread count a loaded model uses at predict time"""
+    if isinstance(model, PackagedModel):
+        pin_model_threads(model.model, threads)
+    elif hasattr(model, 'get_booster'):
+        # XGBoost sklearn wrapper: n_jobs maps to the booster's nthread. Set the
+        # attribute directly; set_params fails on models pickled by older XGBoost
+        model.n_jobs = threads
+        model.get_booster().set_param({'nthread': threads})
+    elif hasattr(model, 'set_param'):
+        # Raw xgboost.Booster
+        model.set_param({'nthread': threads})
+    elif hasattr(model, 'get_params') and 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=threads)
+    return model
+
+
+class PackagedModel:
+    """
+    Model package saved by the onion trainer (model, label_encoders, scaler)
+    predict() preprocesses the same way as onion-final/predict.py: categorical
+    name columns of a DataFrame are label-encoded, and MLP packages are scaled.
+    """
+
+    def __init__(self, package):
+        self.model = package['model']
+        self.label_encoders = package.get('label_encoders', {})
+        self.scaler = package.get('scaler')
+        self.model_type = package.get('model_type', 'unknown')
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X.copy()
+            for col, le in self.label_encoders.items():
+                # Already-encoded columns are passed through
+                if col in X.columns and not pd.api.types.is_numeric_dtype(X[col]):
+                    X[col] = le.transform(X[col])
+        if self.scaler is not None and self.model_type == 'MLP Regressor':
+            X = self.scaler.transform(X)
+        return self.model.predict(X)
+
+
+def load_predictor(path):
+    """Load a model file; onion packages keep their encoders and scaler"""
+    model = joblib.load(path)
+    if isinstance(model, dict) and 'model' in model:
+        model = PackagedModel(model)
+    return model
+
+
+def _init_worker(model_paths, threads):
+    global _MODEL_PATHS, _THREADS
+    _MODEL_PATHS = model_paths
+    _THREADS = threads
+    if threads is not None:
+        limit_native_threads(threads)
+
+
+def _get_model(name):
+    if name not in _MODELS:
+        model = load_predictor(_MODEL_PATHS[name])
+        if _THREADS is not None:
+            pin_model_threads(model, _THREADS)
+        _MODELS[name] = model
+    return _MODELS[name]
+
+
+def _predict(name, X):
+    return _get_model(name).predict(X)
+
+
+def _warm_up(name, barrier):
+    _get_model(name)
+    # Hold this worker until every other one has loaded too, so no worker
+    # takes two warm-up tasks and each one ends up with the model
+    barrier.wait(timeout=WARM_UP_TIMEOUT)
+    return os.getpid()
+
+
+class PredictorPool:
+    """
+    Process pool of predictors sized for a latency or throughput profile
+    model_paths: {name: path} of joblib/pickle models; defaults to every crop model on disk
+    processes/threads: override the profile plan; threads=None leaves native pools unmanaged
+    """
+
+    def __init__(self, model_paths=None, profile='latency', cores=None,
+                 processes=None, threads=None, manage_threads=True):
+        if model_paths is None:
+            model_paths = {
+                crop: dataset_path(crop, 'model') for crop in CROP_DATASETS
+                if os.path.exists(dataset_path(crop, 'model'))
+            }
+        plan = plan_pool(profile, cores)
+        self.model_paths = model_paths
+        self.processes = processes or plan['processes']
+        self.threads = (threads or plan['threads']) if manage_threads else None
+        # spawn gives each worker fresh native runtimes instead of forked copies
+        self._mp_context = multiprocessing.get_context('spawn')
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=self._mp_context,
+            initializer=_init_worker,
+            initargs=(model_paths, self.threads),
+        )
+
+    def warm_up(self, name):
+        """Load a model in every worker before serving traffic; returns the worker pids"""
+        with self._mp_context.Manager() as manager:
+            barrier = manager.Barrier(self.processes)
+            futures = [self._executor.submit(_warm_up, name, barrier) for _ in range(self.processes)]
+            return sorted(f.result() for f in futures)
+
+    def submit(self, name, X):
+        return self._executor.submit(_predict, name, X)
+
+    def predict(self, name, X):
+        return self.submit(name, X).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _run_scenario(model_paths, name, batches, **pool_kwargs):
+    with PredictorPool(model_paths, **pool_kwargs) as pool:
+        pool.warm_up(name)
+        latencies = []
+        start = time.perf_counter()
+        futures = []
+        for X in batches:
+            submitted = time.perf_counter()
+            future = pool.submit(name, X)
+            future.add_done_callback(
+                lambda f, t=submitted: latencies.append(time.perf_counter() - t))
+            futures.append(future)
+        wait(futures)
+        elapsed = time.perf_counter() - start
+        return {
+            'processes': pool.processes,
+            'threads': pool.threads,
+            'wall_seconds': round(elapsed, 4),
+            'requests_per_second': round(len(batches) / elapsed, 2),
+            'p50_latency_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+            'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 3),
+        }
+
+
+def benchmark(crop, requests=400, batch_size=1):
+    """
+    Compare unmanaged workers against the latency and throughput profiles
+    Uses an XGBoost model fitted on the crop's cached feature matrix, so the
+    benchmark does not depend on the encoding of the production model files.
+    """
+    from xgboost import XGBRegressor
+    from model_selection import CACHE_DIR, load_feature_matrix
+
+    features = load_feature_matrix(crop)
+    X, y = features['X'], features['y']
+    model_path = os.path.join(CACHE_DIR, f'{crop}_benchmark_xgb.joblib')
+    if not os.path.exists(model_path):
+        # n_jobs=-1 is what an unmanaged predictor ends up using
+        model = XGBRegressor(n_estimators=300, max_depth=6, n_jobs=-1).fit(X, y)
+        joblib.dump(model, model_path)
+
+    rng = np.random.default_rng(42)
+    batches = [X[rng.integers(0, len(X), batch_size)] for _ in range(requests)]
+    model_paths = {crop: model_path}
+    cores = available_cores()
+
+    results = {
+        # Same process count as the latency profile, but every worker spins up full-width pools
+        'unmanaged': _run_scenario(model_paths, crop, batches, profile='latency',
+                                   manage_threads=False),
+    }
+    for profile in PROFILES:
+        results[profile] = _run_scenario(model_paths, crop, batches, profile=profile)
+
+    return {
+        'crop': crop,
+        'cores': cores,
+        'requests': requests,
+        'batch_size': batch_size,
+        'native_pools': [
+            {'api': p['internal_api'], 'threads': p['num_threads']} for p in threadpool_info()
+        ],
+        'results': results,
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(json.dumps({'error': 'Usage: python worker_pool.py <plan|benchmark> [args...]'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    try:
+        if command == 'plan':
+            profile = sys.argv[2] if len(sys.argv) > 2 else 'latency'
+            cores = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            result = plan_pool(profile, cores)
+
+        elif command == 'benchmark':
+            if len(sys.argv) < 3:
+                print(json.dumps({'error': 'Benchmark requires a crop'}))
+                sys.exit(1)
+            crop = sys.argv[2]
+            requests = int(sys.argv[3]) if len(sys.argv) > 3 else 400
+            batch_size = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+            result = benchmark(crop, requests, batch_size)
+
+        else:
+            print(json.dumps({'error': f'Unknown command: {command}'}))
+            sys.exit(1)
+
+    except Exception as e:
+        print(json.dumps({'error': f'Worker pool {command} failed: {str(e)}'}))
+        sys.exit(1)
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
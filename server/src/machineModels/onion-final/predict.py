@@ -9,11 +9,27 @@ import os
 import json
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics'))
+from explain import explain_batch, explanation_cache, format_explanations
+from worker_pool import limit_native_threads, pin_model_threads, predictor_threads
+
+# Every request spawns its own predictor; keep its OpenMP/BLAS pools narrow
+# so concurrent requests do not oversubscribe the cores
+PREDICTOR_THREADS = predictor_threads()
+limit_native_threads(PREDICTOR_THREADS)
+
+FEATURE_COLUMNS = [
+    'District', 'Market Name', 'Variety', 'Year', 'Month',
+    'Rainfall_Minus1', 'Rainfall_Minus2', 'Rainfall_Minus3', 'Total_Rainfall_3Months',
+    'Area_Hectare', 'Yield_TonnePerHectare'
+]
+
 def load_model_and_encoders(model_path):
     """Load the trained model and preprocessing objects from joblib file"""
     try:
         # Load the complete model package (model + encoders + scaler)
         model_package = joblib.load(model_path)
+        pin_model_threads(model_package['model'], PREDICTOR_THREADS)
         return model_package
     except FileNotFoundError:
         return None
@@ -137,6 +153,53 @@ def predict_single(features):
     except Exception as e:
         return {'error': f'Prediction failed: {str(e)}'}
 
+def explain_rows(df):
+    """
+    Predict and explain a batch of rows with per-feature contributions
+    df: DataFrame with FEATURE_COLUMNS, categorical columns as names (not encoded)
+    """
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        model_path = os.path.join(script_dir, 'onion.pkl')
+        
+        model_package = load_model_and_encoders(model_path)
+        if model_package is None:
+            return {'error': 'Could not load model package'}
+        
+        model = model_package['model']
+        label_encoders = model_package['label_encoders']
+        scaler = model_package.get('scaler', None)
+        model_type = model_package.get('model_type', 'unknown')
+        
+        if scaler is not None and model_type == 'MLP Regressor':
+            return {'error': f'Explanations are only available for tree models, not {model_type}'}
+        
+        df = df[FEATURE_COLUMNS].copy()
+        
+        # Encode the whole batch at once with the training encoders
+        for col in ["District", "Market Name", "Variety"]:
+            if col in label_encoders:
+                le = label_encoders[col]
+                unknown = set(df[col]) - set(le.classes_)
+                if unknown:
+                    return {'error': f'Unknown {col.lower()}: {sorted(unknown)[0]}. Available options: {list(le.classes_)}'}
+                df[col] = le.transform(df[col])
+        
+        predictions = model.predict(df)
+        cache = explanation_cache(model_path)
+        contribs, base_values = explain_batch(model, df, cache)
+        if cache is not None:
+            cache.save()
+        
+        explanations = format_explanations(contribs, base_values, FEATURE_COLUMNS)
+        for explanation, prediction in zip(explanations, predictions):
+            explanation['prediction'] = float(prediction)
+        
+        return {'explanations': explanations, 'model_type': model_type}
+        
+    except Exception as e:
+        return {'error': f'Explanation failed: {str(e)}'}
+
 def main():
     if len(sys.argv) < 2:
         print(json.dumps({'error': 'No command provided'}))
@@ -153,6 +216,53 @@ def main():
         result = predict_single(features)
         print(json.dumps(result))
         
+    elif command == 'explain':
+        if len(sys.argv) < 13:  # command + 11 features
+            print(json.dumps({'error': 'Insufficient arguments for explanation'}))
+            sys.exit(1)
+        
+        features = sys.argv[2:13]
+        try:
+            row = {
+                'District': features[0],
+                'Market Name': features[1],
+                'Variety': features[2],
+                'Year': int(features[3]),
+                'Month': int(features[4]),
+                'Rainfall_Minus1': float(features[5]),
+                'Rainfall_Minus2': float(features[6]),
+                'Rainfall_Minus3': float(features[7]),
+                'Total_Rainfall_3Months': float(features[8]),
+                'Area_Hectare': float(features[9]),
+                'Yield_TonnePerHectare': float(features[10])
+            }
+        except ValueError as e:
+            print(json.dumps({'error': f'Invalid feature values: {str(e)}'}))
+            sys.exit(1)
+        
+        result = explain_rows(pd.DataFrame([row]))
+        if 'explanations' in result:
+            result = {**result['explanations'][0], 'model_type': result['model_type']}
+        print(json.dumps(result))
+        
+    elif command == 'explain_batch':
+        if len(sys.argv) < 3:
+            print(json.dumps({'error': 'Batch explanation requires CSV file path'}))
+            sys.exit(1)
+        
+        csv_path = sys.argv[2]
+        if not os.path.exists(csv_path):
+            print(json.dumps({'error': f'CSV file not found: {csv_path}'}))
+            sys.exit(1)
+        
+        data = pd.read_csv(csv_path)
+        missing_cols = set(FEATURE_COLUMNS) - set(data.columns)
+        if missing_cols:
+            print(json.dumps({'error': f'Missing columns: {list(missing_cols)}'}))
+            sys.exit(1)
+        
+        print(json.dumps(explain_rows(data)))
+        
     else:
         print(json.dumps({'error': f'Unknown command: {command}'}))
         sys.exit(1)
@@ -6,13 +6,26 @@ import numpy as np
 import pandas as pd
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'machineModels', 'analytics'))
+from explain import explain_batch, explanation_cache, format_explanations
+from worker_pool import limit_native_threads, pin_model_threads, predictor_threads
+
+# Every request spawns its own predictor; keep its OpenMP/BLAS pools narrow
+# so concurrent requests do not oversubscribe the cores
+PREDICTOR_THREADS = predictor_threads()
+limit_native_threads(PREDICTOR_THREADS)
+
+FEATURE_COLUMNS = ['Year', 'Month', 'Rainfall_Minus1', 'Rainfall_Minus2',
+                   'Rainfall_Minus3', 'Total_Rainfall_3Months',
+                   'Area (Hectare)', 'Yield (Tonne/Hectare)']
+
 def load_model():
     """Load the pretrained model"""
     try:
         # Adjust the path to your model file
         model_path = os.path.join(os.path.dirname(__file__), 'xgboost_price_model.pkl')
         with open(model_path, 'rb') as file:
-            model = pickle.load(file)
+            model = pin_model_threads(pickle.load(file), PREDICTOR_THREADS)
         return model
     except Exception as e:
         print(json.dumps({"error": f"Failed to load model: {str(e)}"}))
@@ -51,18 +64,13 @@ def predict_batch(model, csv_path):
         # Load data
         data = pd.read_csv(csv_path)
         
-        # Expected columns
-        expected_cols = ['Year', 'Month', 'Rainfall_Minus1', 'Rainfall_Minus2', 
-                        'Rainfall_Minus3', 'Total_Rainfall_3Months', 
-                        'Area (Hectare)', 'Yield (Tonne/Hectare)']
-        
         # Check if all columns exist
-        missing_cols = set(expected_cols) - set(data.columns)
+        missing_cols = set(FEATURE_COLUMNS) - set(data.columns)
         if missing_cols:
             return {"error": f"Missing columns: {list(missing_cols)}"}
         
         # Select features in correct order
-        features = data[expected_cols]
+        features = data[FEATURE_COLUMNS]
         
         # Make predictions
         predictions = model.predict(features)
@@ -76,9 +84,25 @@ def predict_batch(model, csv_path):
     except Exception as e:
         return {"error": f"Batch prediction failed: {str(e)}"}
 
+def explain(model, input_data):
+    """Predictions with per-feature contributions (XGBoost pred_contribs) for a batch"""
+    try:
+        cache = explanation_cache(os.path.join(os.path.dirname(__file__), 'xgboost_price_model.pkl'))
+        predictions = model.predict(input_data)
+        contribs, base_values = explain_batch(model, input_data, cache)
+        if cache is not None:
+            cache.save()
+        
+        explanations = format_explanations(contribs, base_values, FEATURE_COLUMNS)
+        for explanation, prediction in zip(explanations, predictions):
+            explanation["prediction"] = float(prediction)
+        return explanations
+    except Exception as e:
+        return {"error": f"Explanation failed: {str(e)}"}
+
 def main():
     if len(sys.argv) < 2:
-        print(json.dumps({"error": "Usage: python predict.py <single|batch> [args...]"}))
+        print(json.dumps({"error": "Usage: python predict.py <single|batch|explain|explain_batch> [args...]"}))
         sys.exit(1)
     
     # Load model
@@ -113,8 +137,43 @@ def main():
         result = predict_batch(model, csv_path)
         print(json.dumps(result))
     
+    elif prediction_type == "explain":
+        if len(sys.argv) != 10:
+            print(json.dumps({"error": "Explain requires 8 feature values"}))
+            sys.exit(1)
+        
+        try:
+            features = [float(arg) for arg in sys.argv[2:]]
+        except ValueError as e:
+            print(json.dumps({"error": f"Invalid feature values: {str(e)}"}))
+            sys.exit(1)
+        
+        result = explain(model, pd.DataFrame([features], columns=FEATURE_COLUMNS))
+        print(json.dumps(result if isinstance(result, dict) else result[0]))
+    
+    elif prediction_type == "explain_batch":
+        if len(sys.argv) != 3:
+            print(json.dumps({"error": "Batch explanation requires CSV file path"}))
+            sys.exit(1)
+        
+        csv_path = sys.argv[2]
+        if not os.path.exists(csv_path):
+            print(json.dumps({"error": f"CSV file not found: {csv_path}"}))
+            sys.exit(1)
+        
+        data = pd.read_csv(csv_path)
+        missing_cols = set(FEATURE_COLUMNS) - set(data.columns)
+        if missing_cols:
+            print(json.dumps({"error": f"Missing columns: {list(missing_cols)}"}))
+            sys.exit(1)
+        
+        result = explain(model, data[FEATURE_COLUMNS])
+        if not isinstance(result, dict):
+            result = {"explanations": result, "total_processed": len(result)}
+        print(json.dumps(result))
+    
     else:
-        print(json.dumps({"error": "Invalid prediction type. Use 'single' or 'batch'"}))
+        print(json.dumps({"error": "Invalid prediction type. Use 'single', 'batch', 'explain' or 'explain_batch'"}))
         sys.exit(1)
 
 if __name__ == "__main__":